@@ -18,6 +18,11 @@ def main():
                         help="Include only these extension(s), e.g. py or [py,js].")
     parser.add_argument("--no-tree", action="store_true",
                         help="Omit the directory tree from the prompt.")
+    parser.add_argument("--max-bytes", type=collate.parse_max_bytes,
+                        default=collate.DEFAULT_MAX_BYTES,
+                        help="Skip files larger than this many bytes (0 = no limit).")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Also list the built-in ignore rules.")
     args = parser.parse_args()
 
     root = os.getcwd()
@@ -26,13 +31,12 @@ def main():
 
     ui.header("analyze-project")
     ui.kv("Root", root)
-    if only:
-        ui.kv("Only", ", ".join(sorted(only)))
+    collate.show_filters(extra_exts=extra, only_exts=only, verbose=args.verbose)
     print()
 
     prompt, included, ignored = collate.build_prompt(
         prompts.ANALYZE_SYSTEM_PROMPT, root=root, include_tree=not args.no_tree,
-        extra_exts=extra, only_exts=only,
+        extra_exts=extra, only_exts=only, max_bytes=args.max_bytes or None,
     )
 
     collate.summarize_run(root, included, ignored)
@@ -16,6 +16,11 @@ def main():
                         help="Include only these extension(s), e.g. py or [py,js].")
     parser.add_argument("--ignore", action="append", default=[],
                         help="Extra extension(s) to ignore.")
+    parser.add_argument("--max-bytes", type=collate.parse_max_bytes,
+                        default=collate.DEFAULT_MAX_BYTES,
+                        help="Skip files larger than this many bytes (0 = no limit).")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Also list the built-in ignore rules.")
     args = parser.parse_args()
 
     root = os.getcwd()
@@ -24,12 +29,12 @@ def main():
 
     ui.header("copy-files")
     ui.kv("Root", root)
-    if only:
-        ui.kv("Only", ", ".join(sorted(only)))
+    collate.show_filters(extra_exts=extra, only_exts=only, verbose=args.verbose)
     print()
 
     xml, included, ignored = collate.collate_files(
-        root, extra_exts=extra, only_exts=only, report=True
+        root, extra_exts=extra, only_exts=only, report=True,
+        max_bytes=args.max_bytes or None,
     )
 
     collate.summarize_run(root, included, ignored)
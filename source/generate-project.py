@@ -21,9 +21,17 @@ def main():
         ui.warn(w)
 
     safe, unsafe = [], []
+    by_type = {"rename": [], "delete": [], "create": []}
     for op in operations:
-        paths = [op["from"], op["to"]] if op["type"] == "rename" else [op["path"]]
-        (safe if all(fileops.is_safe(p) for p in paths) else unsafe).append(op)
+        paths = [op.src, op.dst] if op.type == "rename" else [op.path]
+        if all(fileops.is_safe(p) for p in paths):
+            if op.type == "create":
+                # Encode once: the preview's byte count and the write share it.
+                op = op._replace(content=op.content.encode("utf-8"))
+            safe.append(op)
+            by_type[op.type].append(op)
+        else:
+            unsafe.append(op)
 
     if not safe:
         ui.error("No safe operations to apply.")
@@ -34,19 +42,16 @@ def main():
     ui.kv("Target", root)
     print()
 
-    renames = [o for o in safe if o["type"] == "rename"]
-    deletes = [o for o in safe if o["type"] == "delete"]
-    creates = [o for o in safe if o["type"] == "create"]
-
-    for op in renames:
-        print(f"  {ui.style('rename', 'yellow')}  {op['from']} -> {op['to']}")
-    for op in deletes:
-        print(f"  {ui.style('delete', 'bright_red')}  {op['path']}")
-    for op in creates:
-        size = len(op["content"])
-        print(f"  {ui.style('write ', 'green')}  {op['path']} ({size} bytes)")
+    # One write for the whole preview: a line-buffered terminal would
+    # otherwise flush once per operation.
+    lines = [f"  {ui.style('rename', 'yellow')}  {op.src} -> {op.dst}" for op in by_type["rename"]]
+    lines += [f"  {ui.style('delete', 'bright_red')}  {op.path}" for op in by_type["delete"]]
+    for op in by_type["create"]:
+        size = len(op.content)
+        lines.append(f"  {ui.style('write ', 'green')}  {op.path} ({size} bytes)")
+    print("\n".join(lines))
     for op in unsafe:
-        label = f"{op.get('from')} -> {op.get('to')}" if op["type"] == "rename" else op.get("path")
+        label = f"{op.src} -> {op.dst}" if op.type == "rename" else op.path
         ui.warn(f"unsafe path skipped: {label}")
 
     print()
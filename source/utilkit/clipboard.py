@@ -3,10 +3,16 @@
 Wraps pyperclip so the missing-dependency message and the copy-failure
 fallback are written once instead of in each script.
 """
+import os
+import shutil
 import sys
 
 from . import ui
 
+# Above this many characters, copy() pipes the payload straight into the platform
+# clipboard command instead of going through pyperclip.
+_DIRECT_COPY_CHARS = 1 << 20
+
 
 def _require_pyperclip():
     try:
@@ -19,12 +25,53 @@ def _require_pyperclip():
         sys.exit(1)
 
 
+def _clipboard_command():
+    """Return the argv of a clipboard writer on PATH, or None."""
+    if sys.platform == "darwin":
+        candidates = [["pbcopy"]]
+    elif sys.platform.startswith("linux"):
+        candidates = [["xclip", "-selection", "clipboard"], ["xsel", "--clipboard", "--input"]]
+        if os.environ.get("WAYLAND_DISPLAY"):
+            candidates.insert(0, ["wl-copy"])
+    else:
+        return None
+    for argv in candidates:
+        if shutil.which(argv[0]):
+            return argv
+    return None
+
+
+def _copy_direct(text):
+    """Write ``text`` to the clipboard command in one encode and one pipe write.
+
+    Returns False when no command is available or it fails, so the caller can
+    fall back to pyperclip.
+    """
+    argv = _clipboard_command()
+    if argv is None:
+        return False
+    import subprocess
+
+    try:
+        # Only stdin is piped: xclip keeps running in the background to serve
+        # the selection, and inherited stdout/stderr pipes would block here.
+        result = subprocess.run(argv, input=text.encode("utf-8"),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return result.returncode == 0
+
+
 def copy(text, *, on_overflow_print=True):
     """Copy ``text`` to the clipboard.
 
-    If the payload is too large for the clipboard, optionally print it to
-    stdout as a fallback and exit non-zero (matching the prior behavior).
+    Large payloads on macOS/Linux are piped directly to pbcopy/xclip/xsel/
+    wl-copy, skipping pyperclip's per-call text handling. If the payload is
+    too large for the clipboard, optionally print it to stdout as a fallback
+    and exit non-zero (matching the prior behavior).
     """
+    if len(text) > _DIRECT_COPY_CHARS and _copy_direct(text):
+        return True
     pyperclip = _require_pyperclip()
     try:
         pyperclip.copy(text)
@@ -1,54 +1,99 @@
 """Collate a project into the XML file format and assemble full LLM prompts."""
+import argparse
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-from . import ui, walk
+from . import config, ui, walk
 
+# Default --max-bytes for the CLI tools: bigger files get a placeholder.
+DEFAULT_MAX_BYTES = 1 << 20
 
-def collate_files(root, *, extra_exts=None, only_exts=None, report=True):
+
+def collate_files(root, *, extra_exts=None, only_exts=None, report=True, nodes=None,
+                  max_bytes=None):
     """Walk the project and return ``(xml_text, included, ignored_count)``.
 
     When ``report`` is True, prints each file as it is processed so the user can
-    watch progress, just like the original tools did.
+    watch progress, just like the original tools did. ``nodes`` reuses a walk
+    already done by :func:`utilkit.walk.walk_project`. Files larger than
+    ``max_bytes`` are not read; a ``<file ... truncated="true" />`` placeholder
+    stands in for them and they count as skipped.
+    """
+    pieces, included, ignored = _collate_pieces(
+        root, extra_exts=extra_exts, only_exts=only_exts, report=report, nodes=nodes,
+        max_bytes=max_bytes,
+    )
+    return "".join(pieces), included, ignored
+
+
+def _collate_pieces(root, *, extra_exts, only_exts, report, nodes, max_bytes):
+    """Like :func:`collate_files`, but return the XML as a flat list of strings.
+
+    File contents go into the list as-is rather than being copied into a
+    per-file f-string, so the caller's single ``"".join`` is the only copy of
+    the payload, which matters for multi-megabyte projects.
     """
-    blocks = []
+    pieces = []
     included = []
     ignored = 0
 
-    for rel, full in walk.iter_text_files(root, extra_exts=extra_exts, only_exts=only_exts):
-        if report:
-            print(f"  {ui.style('+', 'green')} {rel}")
-        try:
-            with open(full, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-        except OSError as exc:
-            ui.warn(f"could not read {rel}: {exc}")
-            ignored += 1
-            continue
-        blocks.append(f'<file path="{rel}">\n<![CDATA[\n{content}\n]]>\n</file>')
-        included.append(rel)
+    files = list(walk.iter_files(root, extra_exts=extra_exts, only_exts=only_exts, nodes=nodes))
+    with walk.root_fd(os.path.abspath(root)) as dir_fd:
+
+        def read(item):
+            rel, full = item
+            try:
+                return walk.read_text(full if dir_fd is None else rel, dir_fd=dir_fd,
+                                      max_bytes=max_bytes)
+            except (OSError, walk.FileTooLarge) as exc:
+                return exc
 
-    return "\n".join(blocks), included, ignored
+        with ThreadPoolExecutor(max_workers=config.IO_WORKERS) as pool:
+            # map() yields in submission order, so output stays deterministic.
+            for (rel, _), content in zip(files, pool.map(read, files)):
+                if isinstance(content, OSError):
+                    ui.warn(f"could not read {rel}: {content}")
+                    ignored += 1
+                    continue
+                if content is None:
+                    continue
+                if pieces:
+                    pieces.append("\n")
+                if isinstance(content, walk.FileTooLarge):
+                    if report:
+                        print(f"  {ui.style('~', 'yellow')} {rel} (too large: {content})")
+                    pieces.append(f'<file path="{rel}" size="{content.size}" truncated="true" />')
+                    ignored += 1
+                    continue
+                if report:
+                    print(f"  {ui.style('+', 'green')} {rel}")
+                pieces += (f'<file path="{rel}">\n<![CDATA[\n', content, "\n]]>\n</file>")
+                included.append(rel)
+
+    return pieces, included, ignored
 
 
 def build_prompt(system_prompt, *, root, include_tree=True,
-                 extra_exts=None, only_exts=None, report=True):
+                 extra_exts=None, only_exts=None, report=True, max_bytes=None):
     """Assemble a complete prompt: system prompt + optional tree + file contents."""
     parts = [system_prompt, "\n\n<context>\n"]
+    nodes = walk.walk_project(root, extra_exts=extra_exts, only_exts=only_exts)
 
     if include_tree:
         if report:
             ui.info("building directory tree")
         parts.append("Directory tree:\n\n")
-        parts.append(walk.render_tree(root, extra_exts=extra_exts, only_exts=only_exts))
+        parts.append(walk.format_tree(root, nodes))
         parts.append("\nFile contents:\n\n")
 
     if report:
         ui.info("collating files")
-    xml, included, ignored = collate_files(
-        root, extra_exts=extra_exts, only_exts=only_exts, report=report
+    pieces, included, ignored = _collate_pieces(
+        root, extra_exts=extra_exts, only_exts=only_exts, report=report, nodes=nodes,
+        max_bytes=max_bytes,
     )
-    parts.append(xml)
+    parts += pieces
     parts.append("\n</context>")
 
     return "".join(parts), included, ignored
@@ -69,6 +114,32 @@ def parse_extension_list(raw):
     return result
 
 
+def parse_max_bytes(raw):
+    """argparse ``type`` for ``--max-bytes``: a byte count of 0 or more."""
+    try:
+        value = int(raw)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number of bytes, got {raw!r}")
+    if value < 0:
+        raise argparse.ArgumentTypeError("must be 0 (no limit) or more")
+    return value
+
+
+def show_filters(*, extra_exts=None, only_exts=None, verbose=False):
+    """Print the active extension filters.
+
+    The full ignore lists are long, so they are only sorted and printed when
+    ``verbose`` is set instead of on every run.
+    """
+    if only_exts:
+        ui.kv("Only", ", ".join(sorted(only_exts)))
+    if not verbose:
+        return
+    ui.kv("Ignored dirs", ", ".join(sorted(config.IGNORED_DIRECTORIES)))
+    ui.kv("Ignored files", ", ".join(sorted(config.IGNORED_FILENAMES)))
+    ui.kv("Ignored exts", ", ".join(sorted(config.IGNORED_EXTENSIONS | set(extra_exts or ()))))
+
+
 def summarize_run(root, included, ignored):
     """Print a tidy summary of what was collated."""
     ui.rule()
@@ -42,6 +42,10 @@ IGNORED_FILENAMES = {
     ".aider.input.history",
 }
 
+# File reads and writes release the GIL, so the collator and generate-project
+# spread them over a few threads per core to overlap their latency.
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 
 def config_dir():
     """Per-user config directory, portable across Windows/macOS/Linux."""
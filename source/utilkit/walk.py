@@ -4,120 +4,383 @@ Extracted from the four context tools that each carried their own copy. The
 ignore sets come from :mod:`utilkit.config`; per-invocation extra ignores and
 an ``only`` allow-list are passed in by the caller.
 """
-import io
+import contextlib
+import functools
 import os
+import stat
 import sys
 
 from . import config, ui
 
 
+_SNIFF_BYTES = 1024
+
+
+class FileTooLarge(Exception):
+    """Raised by :func:`read_text` for a file over its ``max_bytes`` limit."""
+
+    def __init__(self, size):
+        super().__init__(f"{size} bytes")
+        self.size = size
+
+
 def is_binary(path):
     try:
         with open(path, "rb") as f:
-            return b"\0" in f.read(1024)
+            return b"\0" in f.read(_SNIFF_BYTES)
     except OSError:
         return True
 
 
+@contextlib.contextmanager
+def root_fd(root):
+    """Yield a directory descriptor for ``root`` to pass as ``dir_fd``.
+
+    Opening files relative to it (``openat``) spares the kernel re-resolving
+    every component of ``root`` for each file. Yields None on platforms
+    without ``dir_fd`` support, such as Windows.
+    """
+    if os.open not in os.supports_dir_fd:
+        yield None
+        return
+    fd = os.open(root, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def _read_fd(fd, max_bytes=None):
+    """Read all of ``fd`` with one ``fstat`` and, normally, one ``read``.
+
+    A buffered ``open().read()`` adds isatty/lseek/fstat probes and a final
+    empty read per file. Asking for one byte more than the size lets a short
+    read prove EOF; files that changed size meanwhile are drained in a loop.
+    The same ``fstat`` enforces ``max_bytes``: an oversized file only has its
+    first ``_SNIFF_BYTES`` read, and those are returned when they hold a NUL
+    so the caller still drops it as binary rather than reporting it as
+    too large.
+    """
+    size = os.fstat(fd).st_size
+    if max_bytes is not None and size > max_bytes:
+        head = os.read(fd, _SNIFF_BYTES)
+        if b"\0" in head:
+            return head
+        raise FileTooLarge(size)
+    data = os.read(fd, size + 1)
+    if len(data) == size:
+        return data
+    chunks = [data]
+    while data:
+        data = os.read(fd, 1 << 20)
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def read_text(path, *, dir_fd=None, max_bytes=None):
+    """Return the text of ``path``, or None if it looks binary.
+
+    One binary read serves both the NUL sniff and the content, instead of an
+    :func:`is_binary` open followed by a second text-mode open. Newlines are
+    normalized the way text mode would. ``path`` is relative to ``dir_fd``
+    when one is given. Raises OSError if unreadable and :class:`FileTooLarge`
+    if bigger than ``max_bytes``.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0), dir_fd=dir_fd)
+    try:
+        data = _read_fd(fd, max_bytes)
+    finally:
+        os.close(fd)
+    if b"\0" in data[:_SNIFF_BYTES]:
+        return None
+    text = data.decode("utf-8", "ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
 def _ext(filename):
-    return os.path.splitext(filename)[1].lower().lstrip(".")
+    """Lower-cased extension without the dot; ``""`` for ``Makefile``/``.env``.
+
+    Called for every file in the walk, so it slices once and only lower-cases
+    when needed rather than chaining splitext/lower/lstrip allocations.
+    """
+    dot = filename.rfind(".")
+    if dot <= 0 or (filename[0] == "." and not filename[:dot].lstrip(".")):
+        return ""
+    ext = filename[dot + 1:]
+    return ext if ext.islower() else ext.lower()
+
+
+@functools.lru_cache(maxsize=1)
+def _ignored_names():
+    """Directory and file names that are always skipped, as one lookup set.
+
+    Cached like the predicates built from it: :mod:`utilkit.config` applies
+    the user's overrides at import, so the sets are fixed by the first walk.
+    """
+    return frozenset(config.IGNORED_DIRECTORIES | config.IGNORED_FILENAMES)
+
+
+def _script_key():
+    """``(name, st_dev, st_ino)`` of the running script, or None.
+
+    Lets the tools skip their own source with a name compare plus a cached
+    ``DirEntry.stat`` instead of a ``samefile`` (two stats) per entry.
+    """
+    return _stat_key(sys.argv[0] if sys.argv else "")
+
+
+@functools.lru_cache(maxsize=4)
+def _stat_key(script):
+    """Stat ``script`` once per process, however many walks ask for it."""
+    try:
+        path = os.path.abspath(script)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return os.path.basename(path), st.st_dev, st.st_ino
+
+
+def _is_script(name, stat_fn, script):
+    if script is None or name != script[0]:
+        return False
+    try:
+        st = stat_fn()
+    except OSError:
+        return False
+    return (st.st_dev, st.st_ino) == script[1:]
 
 
 def should_ignore(path, root, *, extra_exts=None, only_exts=None):
     """Return True if ``path`` should be excluded from collation/tree output."""
-    extra_exts = extra_exts or set()
-    only_exts = only_exts or set()
     abs_path = os.path.abspath(path)
-    filename = os.path.basename(abs_path)
-
     try:
         rel = os.path.relpath(abs_path, root)
     except ValueError:
         return True
-
-    parts = rel.replace(os.sep, "/").split("/")
-    if any(part in config.IGNORED_DIRECTORIES for part in parts):
-        return True
-    if filename in config.IGNORED_FILENAMES:
+    names = _ignored_names()
+    if any(part in names for part in rel.replace(os.sep, "/").split("/")):
         return True
+    skip = _skip_for(extra_exts, only_exts)
+    return skip(os.path.basename(abs_path), os.path.isfile(abs_path), lambda: os.stat(abs_path))
 
-    if os.path.isfile(abs_path):
-        ext = _ext(filename)
-        if ext in config.IGNORED_EXTENSIONS or ext in extra_exts:
-            return True
-        if only_exts and ext not in only_exts:
-            return True
 
+def _skip_for(extra_exts, only_exts):
+    """Return the :func:`_make_skip` predicate for these filters, built once."""
+    return _make_skip(frozenset(extra_exts or ()), frozenset(only_exts or ()))
+
+
+@functools.lru_cache(maxsize=8)
+def _make_skip(extra_exts, only_exts):
+    """Build the per-entry ignore test, ``skip(name, is_file, stat_fn)``.
+
+    The ignore sets are fixed for a whole walk, so they are merged once and
+    bound as closure cells instead of being passed and unioned per call, and
+    the ``only_exts`` branch is compiled out when there is no allow-list.
+
+    Only the entry's own name is checked against the ignored names; the
+    walkers never descend into an ignored directory, so re-splitting the
+    relative path and testing every ancestor again would be wasted work.
+    """
+    names = _ignored_names()
+    exts = frozenset(config.IGNORED_EXTENSIONS.union(extra_exts or ()))
+    only = frozenset(only_exts or ())
+    script = _script_key()
+
+    if only:
+        def skip(name, is_file, stat_fn):
+            if name in names:
+                return True
+            if is_file:
+                ext = _ext(name)
+                if ext in exts or ext not in only:
+                    return True
+            return _is_script(name, stat_fn, script)
+    else:
+        def skip(name, is_file, stat_fn):
+            if name in names:
+                return True
+            if is_file and _ext(name) in exts:
+                return True
+            return _is_script(name, stat_fn, script)
+    return skip
+
+
+def _is_dir(entry):
+    """``entry.is_dir()``, but False instead of raising, like ``os.path.isdir``.
+
+    With an unknown ``d_type`` (NFS, some FUSE mounts) the ``DirEntry``
+    checks fall back to a stat that can fail; one unreadable entry must not
+    abort the whole walk.
+    """
     try:
-        script = os.path.abspath(sys.argv[0])
-        if os.path.exists(script) and os.path.samefile(abs_path, script):
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _is_file(entry):
+    """``entry.is_file()``, False on error; see :func:`_is_dir`."""
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+
+def _is_link(entry):
+    """True for a symlink or, on Windows, a junction; False on error.
+
+    ``DirEntry.is_symlink()`` is False for a junction (``mklink /J``), yet it
+    can lead back into an ancestor just the same. On Windows the reparse tag
+    comes with the directory listing, so the extra check costs no syscall.
+    See :func:`_is_dir` for why errors are swallowed.
+    """
+    try:
+        if entry.is_symlink():
             return True
-    except (OSError, ValueError):
+        if os.name == "nt":
+            tag = entry.stat(follow_symlinks=False).st_reparse_tag
+            return tag == stat.IO_REPARSE_TAG_MOUNT_POINT
+    except OSError:
         pass
     return False
 
 
-def render_tree(root, *, extra_exts=None, only_exts=None, only_folders=False, depth=None):
-    """Return a string drawing of the directory tree rooted at ``root``.
+def _name_key(entry):
+    return entry.name.lower()
 
-    ``only_folders`` excludes files from the output. ``depth`` limits how many
-    levels are shown (1 = immediate children of ``root``, 2 = their children, ...).
+
+def _scan(path):
+    """Return the ``DirEntry`` objects of ``path`` sorted case-insensitively, or ``[]``."""
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=_name_key)
+    except OSError:
+        return []
+
+
+def walk_project(root, *, extra_exts=None, only_exts=None, only_folders=False, depth=None,
+                 follow_links=True):
+    """Walk ``root`` once and return every accepted entry in tree order.
+
+    Items are ``(rel_path, is_dir, entry, level, last)`` tuples in pre-order,
+    siblings sorted case-insensitively; ``level`` starts at 1 for the children
+    of ``root`` and ``last`` marks the final sibling. A directory that resolves
+    to one already visited gets a single ``(rel_path, False, None, level, True)``
+    marker as its only child instead of being walked again. With
+    ``follow_links=False`` symlinked (or junctioned) directories are listed but
+    never entered.
+
+    The tree renderer and the collator both consume this list, so a prompt
+    with a tree and file contents costs one traversal instead of two.
     """
-    out = io.StringIO()
+    skip = _skip_for(extra_exts, only_exts)
     seen = set()
 
+    def children(path, real, rel_dir, level):
+        if real in seen:
+            return [(rel_dir, False, None, level, True)]
+        seen.add(real)
+
+        items = []
+        for entry in _scan(path):
+            name = entry.name
+            is_dir = _is_dir(entry)
+            if only_folders and not is_dir:
+                continue
+            if not skip(name, not is_dir and _is_file(entry), entry.stat):
+                items.append((rel_dir + name, is_dir, entry, level, False))
+        if items:
+            items[-1] = items[-1][:4] + (True,)
+        return items
+
+    root = os.path.abspath(root)
+    nodes = []
+    top = os.path.normcase(os.path.realpath(root))
+    stack = [(node, top) for node in reversed(children(root, top, "", 1))]
+    while stack:
+        node, parent_real = stack.pop()
+        nodes.append(node)
+        rel, is_dir, entry, level, _ = node
+        if is_dir and (depth is None or level < depth):
+            # Only a symlink or junction can lead somewhere already seen, so a
+            # plain directory extends its parent's resolved path without a stat.
+            if _is_link(entry):
+                if not follow_links:
+                    continue
+                real = os.path.normcase(os.path.realpath(entry.path))
+            else:
+                real = os.path.join(parent_real, os.path.normcase(entry.name))
+            stack.extend((child, real) for child in
+                         reversed(children(entry.path, real, rel + "/", level + 1)))
+    return nodes
+
+
+def format_tree(root, nodes):
+    """Draw the ``nodes`` returned by :func:`walk_project` as a text tree."""
+    lines = []
     tee = ui.glyph("tee") + " "
     elbow = ui.glyph("elbow") + " "
     pipe = ui.glyph("pipe") + "   "
 
-    def recurse(current, prefix, level):
-        if depth is not None and level > depth:
-            return
-        try:
-            real = os.path.realpath(current)
-            if real in seen:
-                out.write(f"{prefix}{elbow}[symlink cycle: {os.path.basename(current)}]\n")
-                return
-            seen.add(real)
-            entries = sorted(os.listdir(current), key=str.lower)
-        except OSError:
-            return
+    lines.append(f"{os.path.basename(os.path.abspath(root)) or root}/\n")
+    ancestors_last = []
+    for rel, is_dir, entry, level, last in nodes:
+        del ancestors_last[level - 1:]
+        prefix = "".join("    " if done else pipe for done in ancestors_last)
+        if entry is None:
+            name = rel.rstrip("/").rpartition("/")[2]
+            lines.append(f"{prefix}{elbow}[symlink cycle: {name}]\n")
+            continue
+        suffix = "/" if is_dir else ""
+        lines.append(f"{prefix}{elbow if last else tee}{entry.name}{suffix}\n")
+        ancestors_last.append(last)
+    return "".join(lines)
 
-        items = []
-        for entry in entries:
-            full = os.path.join(current, entry)
-            is_dir = os.path.isdir(full)
-            if only_folders and not is_dir:
-                continue
-            if not should_ignore(full, root, extra_exts=extra_exts, only_exts=only_exts):
-                items.append((entry, full, is_dir))
-
-        for i, (name, full, is_dir) in enumerate(items):
-            last = i == len(items) - 1
-            connector = elbow if last else tee
-            suffix = "/" if is_dir else ""
-            out.write(f"{prefix}{connector}{name}{suffix}\n")
-            if is_dir:
-                recurse(full, prefix + ("    " if last else pipe), level + 1)
-
-    out.write(f"{os.path.basename(os.path.abspath(root)) or root}/\n")
-    recurse(root, "", 1)
-    return out.getvalue()
-
-
-def iter_text_files(root, *, extra_exts=None, only_exts=None):
-    """Yield ``(relative_path, absolute_path)`` for each includable text file."""
-    for dirpath, dirnames, filenames in os.walk(root, topdown=True, followlinks=False):
-        dirnames[:] = [
-            d for d in dirnames
-            if not should_ignore(os.path.join(dirpath, d), root,
-                                  extra_exts=extra_exts, only_exts=only_exts)
-        ]
-        for filename in sorted(filenames):
-            full = os.path.join(dirpath, filename)
-            rel = os.path.relpath(full, root).replace(os.sep, "/")
-            if should_ignore(full, root, extra_exts=extra_exts, only_exts=only_exts):
-                continue
-            if is_binary(full):
-                continue
+
+def render_tree(root, *, extra_exts=None, only_exts=None, only_folders=False, depth=None):
+    """Return a string drawing of the directory tree rooted at ``root``.
+
+    ``only_folders`` excludes files from the output. ``depth`` limits how many
+    levels are shown (1 = immediate children of ``root``, 2 = their children, ...).
+    """
+    nodes = walk_project(root, extra_exts=extra_exts, only_exts=only_exts,
+                         only_folders=only_folders, depth=depth)
+    return format_tree(root, nodes)
+
+
+def iter_files(root, *, extra_exts=None, only_exts=None, nodes=None):
+    """Yield ``(relative_path, absolute_path)`` for each accepted file.
+
+    Unlike :func:`iter_text_files` this does no binary sniffing, for callers
+    that read the file anyway (see :func:`read_text`). Pass ``nodes`` from an
+    earlier :func:`walk_project` call to reuse that walk.
+
+    Symlinked directories and junctions are never descended into, so
+    collation cannot read outside ``root``. A shared walk that followed one
+    (the tree does) is replaced by a fresh walk that does not.
+    """
+    if nodes is not None and any(
+        is_dir and _is_link(entry) for _, is_dir, entry, _, _ in nodes
+    ):
+        nodes = None
+    if nodes is None:
+        nodes = walk_project(root, extra_exts=extra_exts, only_exts=only_exts,
+                             follow_links=False)
+    for rel, is_dir, entry, _, _ in nodes:
+        # Dangling links, FIFOs and sockets are drawn in the tree but are not
+        # files; they also never went through the extension filters.
+        if not is_dir and entry is not None and _is_file(entry):
+            yield rel, entry.path
+
+
+def iter_text_files(root, *, extra_exts=None, only_exts=None, nodes=None):
+    """Yield ``(relative_path, absolute_path)`` for each includable text file.
+
+    Pass ``nodes`` from an earlier :func:`walk_project` call to reuse that walk
+    instead of traversing ``root`` again.
+    """
+    for rel, full in iter_files(root, extra_exts=extra_exts, only_exts=only_exts, nodes=nodes):
+        if not is_binary(full):
             yield rel, full
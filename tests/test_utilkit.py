@@ -36,12 +36,114 @@ class TestWalk(unittest.TestCase):
         self.assertFalse(walk.should_ignore(py, self.root, only_exts={"py"}))
         self.assertTrue(walk.should_ignore(py, self.root, only_exts={"js"}))
 
+    def test_extension_edge_cases(self):
+        self.assertEqual(walk._ext("Archive.TAR"), "tar")
+        self.assertEqual(walk._ext("Makefile"), "")
+        self.assertEqual(walk._ext(".env"), "")
+
     def test_iter_text_files_excludes_ignored(self):
         found = {rel for rel, _ in walk.iter_text_files(self.root)}
         self.assertIn("src/a.py", found)
         self.assertNotIn("image.png", found)
         self.assertFalse(any("node_modules" in f for f in found))
 
+    def test_nested_ignored_directory_is_pruned(self):
+        deep = os.path.join(self.root, "src", "build", "pkg")
+        os.makedirs(deep)
+        open(os.path.join(deep, "gen.py"), "w").close()
+        rels = [rel for rel, *_ in walk.walk_project(self.root)]
+        self.assertNotIn("src/build", rels)
+        self.assertFalse(any(rel.startswith("src/build/") for rel in rels))
+
+    def test_symlink_cycle_is_marked_not_followed(self):
+        try:
+            os.symlink("..", os.path.join(self.root, "src", "loop"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        tree = walk.render_tree(self.root)
+        self.assertIn("[symlink cycle: loop]", tree)
+        self.assertEqual(tree.count("a.py"), 1)
+
+    @unittest.skipUnless(os.name == "nt", "junctions are Windows-only")
+    def test_junction_loop_is_marked_not_followed(self):
+        import _winapi
+
+        _winapi.CreateJunction(self.root, os.path.join(self.root, "src", "loop"))
+        tree = walk.render_tree(self.root)
+        self.assertIn("[symlink cycle: loop]", tree)
+        self.assertEqual([rel for rel, _ in walk.iter_text_files(self.root)], ["src/a.py"])
+
+    def test_collation_does_not_follow_symlinked_directories(self):
+        outside = tempfile.mkdtemp()
+        open(os.path.join(outside, "s.py"), "w").close()
+        try:
+            os.symlink(outside, os.path.join(self.root, "ext"))
+            os.symlink("src", os.path.join(self.root, "alias"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        self.assertEqual([rel for rel, _ in walk.iter_text_files(self.root)], ["src/a.py"])
+        nodes = walk.walk_project(self.root)
+        found = [rel for rel, _ in walk.iter_text_files(self.root, nodes=nodes)]
+        self.assertEqual(found, ["src/a.py"])
+
+    def test_only_regular_files_are_collated(self):
+        try:
+            os.symlink("missing.js", os.path.join(self.root, "dead.js"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        found = [rel for rel, _ in walk.iter_files(self.root, only_exts={"py"})]
+        self.assertEqual(found, ["src/a.py"])
+
+    def test_unreadable_entry_does_not_abort_walk(self):
+        class Stale:
+            """A DirEntry whose type checks fall back to a failing stat."""
+            name = "stale.py"
+            path = os.path.join(self.root, "stale.py")
+
+            def _fail(self, *args, **kwargs):
+                raise OSError("stale handle")
+
+            is_dir = is_file = is_symlink = stat = _fail
+
+        real_scan = walk._scan
+        walk._scan = lambda path: real_scan(path) + ([Stale()] if path == self.root else [])
+        try:
+            found = [rel for rel, _ in walk.iter_files(self.root)]
+        finally:
+            walk._scan = real_scan
+        self.assertEqual(found, ["src/a.py"])
+
+    def test_single_walk_feeds_tree_and_files(self):
+        nodes = walk.walk_project(self.root)
+        tree = walk.format_tree(self.root, nodes)
+        self.assertIn("a.py", tree)
+        self.assertNotIn("node_modules", tree)
+        found = [rel for rel, _ in walk.iter_text_files(self.root, nodes=nodes)]
+        self.assertEqual(found, ["src/a.py"])
+
+
+class TestCollate(unittest.TestCase):
+    def test_oversized_file_gets_placeholder(self):
+        root = tempfile.mkdtemp()
+        with open(os.path.join(root, "small.py"), "w") as f:
+            f.write("x = 1\n")
+        with open(os.path.join(root, "big.py"), "w") as f:
+            f.write("#" * 100)
+        xml, included, skipped = collate.collate_files(root, report=False, max_bytes=50)
+        self.assertEqual(included, ["small.py"])
+        self.assertEqual(skipped, 1)
+        self.assertIn('<file path="big.py" size="100" truncated="true" />', xml)
+        self.assertIn("x = 1", xml)
+
+
+    def test_oversized_binary_is_dropped_silently(self):
+        root = tempfile.mkdtemp()
+        with open(os.path.join(root, "data.dat"), "wb") as f:
+            f.write(b"\0" * 200)
+        xml, included, skipped = collate.collate_files(root, report=False, max_bytes=100)
+        self.assertEqual((included, skipped), ([], 0))
+        self.assertNotIn("data.dat", xml)
+
 
 class TestExtensionParsing(unittest.TestCase):
     def test_bracket_list(self):
@@ -53,6 +155,14 @@ class TestExtensionParsing(unittest.TestCase):
     def test_empty(self):
         self.assertEqual(collate.parse_extension_list(None), set())
 
+    def test_max_bytes_rejects_negative(self):
+        import argparse
+
+        self.assertEqual(collate.parse_max_bytes("0"), 0)
+        self.assertEqual(collate.parse_max_bytes("4096"), 4096)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            collate.parse_max_bytes("-1")
+
 
 class TestFileOps(unittest.TestCase):
     def test_parse_all_kinds(self):
@@ -62,22 +172,120 @@ class TestFileOps(unittest.TestCase):
             '<rename from="c" to="d" />'
         )
         ops, warnings = fileops.parse(text)
-        kinds = sorted(o["type"] for o in ops)
+        kinds = sorted(o.type for o in ops)
         self.assertEqual(kinds, ["create", "delete", "rename"])
 
+    def test_parse_keeps_document_order_and_ignores_tags_in_content(self):
+        text = (
+            '<rename from="c" to="d" />\n'
+            '<file path="a.py">\n<![CDATA[\ndoc = \'<delete path="x" />\'\n]]>\n</file>\n'
+            '<delete path="b.txt" />'
+        )
+        ops, _ = fileops.parse(text)
+        self.assertEqual([o.type for o in ops], ["rename", "create", "delete"])
+        self.assertEqual(ops[2].path, "b.txt")
+
     def test_safe_path_rejects_traversal(self):
         self.assertFalse(fileops.is_safe("../escape.py"))
         self.assertFalse(fileops.is_safe("/etc/passwd"))
+        self.assertFalse(fileops.is_safe("src\\..\\..\\escape.py"))
+        self.assertFalse(fileops.is_safe("./C:/Windows/evil.dll"))
+        self.assertFalse(fileops.is_safe("./\\x"))
+        self.assertFalse(fileops.is_safe("././././C:/x"))
+        self.assertFalse(fileops.is_safe("C:x"))
         self.assertTrue(fileops.is_safe("src/app.py"))
+        self.assertTrue(fileops.is_safe("notes..txt"))
 
     def test_apply_creates_file(self):
         root = tempfile.mkdtemp()
-        ops = [{"type": "create", "path": "sub/x.txt", "content": "hi"}]
+        ops = [fileops.Create("sub/x.txt", "hi")]
         counts = fileops.apply(ops, root)
         self.assertEqual(counts["created"], 1)
         with open(os.path.join(root, "sub", "x.txt")) as f:
             self.assertEqual(f.read(), "hi")
 
+    def test_apply_writes_pre_encoded_content(self):
+        root = tempfile.mkdtemp()
+        counts = fileops.apply([fileops.Create("u.txt", "héllo\r\n".encode("utf-8"))], root)
+        self.assertEqual(counts["created"], 1)
+        with open(os.path.join(root, "u.txt"), "rb") as f:
+            self.assertEqual(f.read(), "héllo\r\n".encode("utf-8"))
+
+    def test_apply_deletes_files_and_folders(self):
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, "dir", "sub"))
+        open(os.path.join(root, "file.txt"), "w").close()
+        ops = [fileops.Delete(p) for p in ("dir", "file.txt", "missing")]
+        counts = fileops.apply(ops, root)
+        self.assertEqual((counts["deleted"], counts["errors"]), (3, 0))
+        self.assertEqual(os.listdir(root), [])
+
+    def test_apply_last_write_to_same_path_wins(self):
+        root = tempfile.mkdtemp()
+        ops = [fileops.Create(f"f{i % 3}.txt", str(i)) for i in range(9)]
+        counts = fileops.apply(ops, root)
+        self.assertEqual(counts["created"], 9)
+        with open(os.path.join(root, "f2.txt")) as f:
+            self.assertEqual(f.read(), "8")
+
+    def test_apply_orders_writes_differing_only_in_case(self):
+        root = tempfile.mkdtemp()
+        ops = [fileops.Create("A.txt", "first"), fileops.Create("a.txt", "second")]
+        counts = fileops.apply(ops, root)
+        self.assertEqual((counts["created"], counts["errors"]), (2, 0))
+        with open(os.path.join(root, "a.txt")) as f:
+            self.assertEqual(f.read(), "second")
+
+    def test_apply_orders_writes_through_a_folder_symlink(self):
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, "real"))
+        try:
+            os.symlink("real", os.path.join(root, "link"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        for _ in range(20):
+            ops = [fileops.Create("link/a.txt", "x" * 100000), fileops.Create("real/a.txt", "second")]
+            counts = fileops.apply(ops, root)
+            self.assertEqual((counts["created"], counts["errors"]), (2, 0))
+            with open(os.path.join(root, "real", "a.txt")) as f:
+                self.assertEqual(f.read(), "second")
+
+    def test_apply_recreates_folder_deleted_earlier_in_batch(self):
+        root = tempfile.mkdtemp()
+        ops = [
+            fileops.Create("pkg/a.txt", "a"),
+            fileops.Delete("pkg"),
+            fileops.Create("pkg/b.txt", "b"),
+        ]
+        counts = fileops.apply(ops, root)
+        self.assertEqual(counts["errors"], 0)
+        self.assertEqual(os.listdir(os.path.join(root, "pkg")), ["b.txt"])
+
+    def test_apply_recreates_folder_after_deleting_folder_symlink(self):
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, "real"))
+        try:
+            os.symlink("real", os.path.join(root, "link"))
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        ops = [
+            fileops.Create("link/a.txt", "a"),
+            fileops.Delete("link"),
+            fileops.Create("link/b.txt", "b"),
+        ]
+        counts = fileops.apply(ops, root)
+        self.assertEqual((counts["created"], counts["errors"]), (2, 0))
+        self.assertEqual(os.listdir(os.path.join(root, "link")), ["b.txt"])
+        self.assertEqual(os.listdir(os.path.join(root, "real")), ["a.txt"])
+
+    def test_apply_renames_into_new_folder(self):
+        root = tempfile.mkdtemp()
+        open(os.path.join(root, "a.txt"), "w").close()
+        ops = [fileops.Rename("a.txt", "new/b.txt"), fileops.Rename("gone.txt", "c.txt")]
+        counts = fileops.apply(ops, root)
+        self.assertEqual((counts["renamed"], counts["errors"]), (1, 1))
+        self.assertEqual(os.listdir(os.path.join(root, "new")), ["b.txt"])
+
 
 class TestSessions(unittest.TestCase):
     def setUp(self):